@@ -3,25 +3,99 @@ AI Analysis Module - Free Implementation using Ollama
 Uses local LLM models (Llama 3.1, Mistral, etc.) for zero-cost AI processing
 """
 
+import asyncio
 import json
-import re
+import time
 import ollama
 
 
+RECOMMENDED_QUANTIZATIONS = ('Q4_K_M', 'Q5_K_M')
+
+# How long a connection check result is reused (health checks may poll every second)
+CONNECTION_CHECK_TTL_SECONDS = 10
+
+# Static instructions go first so Ollama can reuse the cached prompt prefix;
+# only the per-request content (OCR text, question) changes between calls.
+ANALYZE_SYSTEM_PROMPT = """You are a medical consent form analyzer. Analyze the consent form text provided by the user and extract information in JSON format.
+
+Extract the following information and return ONLY a valid JSON object with these fields:
+- patient_name: Patient's full name
+- patient_email: Patient's email address (if available)
+- patient_dob: Patient's date of birth (format: YYYY-MM-DD or as written)
+- doctor_name: Name of the doctor/physician
+- procedure: Medical procedure or treatment
+- procedure_date: Date of procedure (format: YYYY-MM-DD or as written)
+- consented_items: Array of items/procedures the patient consented to
+- declined_items: Array of items the patient declined or refused
+- summary: A 2-3 sentence summary of the consent form
+
+Important:
+- Return ONLY the JSON object, no additional text
+- If a field is not found, use null
+- For email, if not found, generate format: firstname.lastname@example.com
+- For consented_items and declined_items, return arrays even if empty
+- Be thorough in identifying what was consented to vs declined"""
+
+# JSON schema passed as Ollama's `format` so decoding is grammar-constrained
+# to exactly the fields of _get_default_analysis()
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'patient_name': {'type': ['string', 'null']},
+        'patient_email': {'type': ['string', 'null']},
+        'patient_dob': {'type': ['string', 'null']},
+        'doctor_name': {'type': ['string', 'null']},
+        'procedure': {'type': ['string', 'null']},
+        'procedure_date': {'type': ['string', 'null']},
+        'consented_items': {'type': 'array', 'items': {'type': 'string'}},
+        'declined_items': {'type': 'array', 'items': {'type': 'string'}},
+        'summary': {'type': ['string', 'null']}
+    },
+    'required': [
+        'patient_name', 'patient_email', 'patient_dob', 'doctor_name', 'procedure',
+        'procedure_date', 'consented_items', 'declined_items', 'summary'
+    ]
+}
+
+QUERY_SYSTEM_PROMPT = """You are a helpful medical consent assistant. Answer the patient's question based ONLY on their consent form data provided by the user.
+
+IMPORTANT RULES:
+- Answer based ONLY on the consent form data provided
+- Be clear, patient-friendly, and concise
+- If the information is not in the consent forms, politely say you don't have that information
+- NEVER discuss or mention other patients' data
+- Focus on what the patient consented to, declined, procedures, and dates
+- Be helpful and professional"""
+
+QUERY_FALLBACK_ANSWER = "I apologize, but I'm having trouble processing your query right now. Please try again."
+
+
 class AIAnalyzer:
     """Handle AI analysis using local Ollama models"""
 
-    def __init__(self, model='llama3.1', host='http://localhost:11434'):
+    def __init__(self, chat_model='llama3.1:8b-instruct-q4_K_M', extract_model='llama3.2:3b-instruct-q4_K_M',
+                 host='http://localhost:11434', keep_alive=-1, client=None):
         """
         Initialize AI analyzer with Ollama
 
         Args:
-            model: Ollama model name (llama3.1, mistral, gemma2, etc.)
+            chat_model: Ollama model for patient-facing answers (llama3.1, mistral, gemma2, etc.)
+            extract_model: Smaller Ollama model for structured consent form extraction
             host: Ollama server URL
+            keep_alive: How long Ollama keeps the model loaded after a request
+                        (-1 keeps it resident, or a duration such as '30m')
+            client: Existing ollama.Client to share (defaults to a new one for host)
         """
-        self.model = model
+        self.chat_model = chat_model
+        self.extract_model = extract_model
         self.host = host
-        print(f"Initialized AI Analyzer with model: {model}")
+        # Ollama expects negative/plain values as numbers, durations as strings
+        if isinstance(keep_alive, str) and keep_alive.lstrip('-').isdigit():
+            keep_alive = int(keep_alive)
+        self.keep_alive = keep_alive
+        self.client = client or ollama.Client(host=host)
+        self._connection_status = None  # (checked_at, result) of the last connection check
+        print(f"Initialized AI Analyzer with models: {chat_model} (chat), {extract_model} (extraction)")
 
     def analyze_consent_form(self, ocr_text):
         """
@@ -33,67 +107,66 @@ class AIAnalyzer:
         Returns:
             dict: Structured consent data
         """
-        print(f"Analyzing consent form with {self.model}...")
+        print(f"Analyzing consent form with {self.extract_model}...")
 
-        prompt = f"""You are a medical consent form analyzer. Analyze the following consent form text and extract information in JSON format.
+        try:
+            response = self.client.chat(**self._analysis_request(ocr_text))
+            return self._parse_analysis(response['message']['content'])
 
-CONSENT FORM TEXT:
-{ocr_text}
+        except Exception as e:
+            print(f"AI analysis failed: {str(e)}")
+            return self._get_default_analysis()
 
-Extract the following information and return ONLY a valid JSON object with these fields:
-- patient_name: Patient's full name
-- patient_email: Patient's email address (if available)
-- patient_dob: Patient's date of birth (format: YYYY-MM-DD or as written)
-- doctor_name: Name of the doctor/physician
-- procedure: Medical procedure or treatment
-- procedure_date: Date of procedure (format: YYYY-MM-DD or as written)
-- consented_items: Array of items/procedures the patient consented to
-- declined_items: Array of items the patient declined or refused
-- summary: A 2-3 sentence summary of the consent form
+    def analyze_consent_forms(self, ocr_texts):
+        """
+        Analyze several consent forms concurrently
 
-Important:
-- Return ONLY the JSON object, no additional text
-- If a field is not found, use null
-- For email, if not found, generate format: firstname.lastname@example.com
-- For consented_items and declined_items, return arrays even if empty
-- Be thorough in identifying what was consented to vs declined
+        All requests are sent at once so Ollama can spread them over its
+        parallel slots (OLLAMA_NUM_PARALLEL) instead of running them in turn.
 
-JSON Response:"""
+        Args:
+            ocr_texts: List of raw texts extracted from PDFs
 
-        try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }]
-            )
+        Returns:
+            list: Structured consent data, in the same order as ocr_texts
+        """
+        print(f"Analyzing {len(ocr_texts)} consent forms with {self.extract_model}...")
+        return asyncio.run(self._analyze_consent_forms_async(ocr_texts))
 
-            response_text = response['message']['content'].strip()
+    async def _analyze_consent_forms_async(self, ocr_texts):
+        """Run all analyses at once on worker threads sharing self.client"""
+        return await asyncio.gather(*(asyncio.to_thread(self.analyze_consent_form, text) for text in ocr_texts))
 
-            # Extract JSON from response (handle cases where model adds extra text)
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(0)
+    def _analysis_request(self, ocr_text):
+        """Build chat arguments: static instructions first, OCR text last, schema-constrained output"""
+        return {
+            'model': self.extract_model,
+            'messages': [
+                {'role': 'system', 'content': ANALYZE_SYSTEM_PROMPT},
+                {'role': 'user', 'content': f"CONSENT FORM TEXT:\n{ocr_text}\n\nJSON Response:"}
+            ],
+            'format': ANALYSIS_SCHEMA,
+            'options': {'temperature': 0.1},
+            'keep_alive': self.keep_alive
+        }
 
-            # Parse JSON
+    def _parse_analysis(self, response_text):
+        """Parse the model's JSON reply into a validated analysis dict"""
+        try:
+            # Output is constrained to ANALYSIS_SCHEMA, so no extraction is needed;
+            # this only fails if generation was cut off
             analysis = json.loads(response_text)
-
-            # Validate and set defaults
-            analysis = self._validate_analysis(analysis)
-
-            print("AI analysis completed successfully!")
-            return analysis
-
         except json.JSONDecodeError as e:
             print(f"Failed to parse JSON from AI response: {e}")
             print(f"Raw response: {response_text[:500]}")
             # Return default structure
             return self._get_default_analysis()
 
-        except Exception as e:
-            print(f"AI analysis failed: {str(e)}")
-            return self._get_default_analysis()
+        # Replace nulls with defaults
+        analysis = self._validate_analysis(analysis)
+
+        print("AI analysis completed successfully!")
+        return analysis
 
     def answer_query(self, query, patient_consents):
         """
@@ -104,47 +177,51 @@ JSON Response:"""
             patient_consents: List of consent data for this patient
 
         Returns:
-            str: AI-generated answer
+            str: AI-generated answer, or QUERY_FALLBACK_ANSWER if generation failed
         """
-        print(f"Processing query with {self.model}...")
-
-        # Format consent data for context
-        context = self._format_consents_for_context(patient_consents)
+        try:
+            return ''.join(self.stream_answer_query(query, patient_consents)).strip()
+        except Exception:
+            return QUERY_FALLBACK_ANSWER
 
-        prompt = f"""You are a helpful medical consent assistant. Answer the patient's question based ONLY on their consent form data below.
+    def stream_answer_query(self, query, patient_consents):
+        """
+        Answer patient query, yielding the answer as it is generated
 
-PATIENT'S CONSENT FORMS:
-{context}
+        Args:
+            query: Patient's natural language question
+            patient_consents: List of consent data for this patient
 
-PATIENT'S QUESTION:
-{query}
+        Yields:
+            str: Pieces of the AI-generated answer
 
-IMPORTANT RULES:
-- Answer based ONLY on the consent form data provided above
-- Be clear, patient-friendly, and concise
-- If the information is not in the consent forms, politely say you don't have that information
-- NEVER discuss or mention other patients' data
-- Focus on what the patient consented to, declined, procedures, and dates
-- Be helpful and professional
+        Raises:
+            Exception: If Ollama fails, possibly after some pieces were already yielded
+        """
+        print(f"Processing query with {self.chat_model}...")
 
-Your Answer:"""
+        # Format consent data for context
+        context = self._format_consents_for_context(patient_consents)
 
         try:
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }]
+            stream = self.client.chat(
+                model=self.chat_model,
+                messages=[
+                    {'role': 'system', 'content': QUERY_SYSTEM_PROMPT},
+                    {'role': 'user', 'content': f"PATIENT'S CONSENT FORMS:\n{context}\n\n"
+                                                f"PATIENT'S QUESTION:\n{query}\n\nYour Answer:"}
+                ],
+                keep_alive=self.keep_alive,
+                stream=True
             )
 
-            answer = response['message']['content'].strip()
+            for chunk in stream:
+                yield chunk['message']['content']
             print("Query answered successfully!")
-            return answer
 
         except Exception as e:
             print(f"Query processing failed: {str(e)}")
-            return "I apologize, but I'm having trouble processing your query right now. Please try again."
+            raise
 
     def _format_consents_for_context(self, patient_consents):
         """Format consent data for AI context"""
@@ -190,21 +267,71 @@ CONSENT FORM #{idx}:
             'summary': 'Unable to extract summary from consent form.'
         }
 
-    def check_ollama_connection(self):
-        """Check if Ollama is running and model is available"""
+    def warm_up(self):
+        """Load both models, pin them in memory and prime their prompt caches"""
         try:
-            # Try to list models
-            models = ollama.list()
-            print(f"Ollama is running. Available models: {[m['name'] for m in models.get('models', [])]}")
+            for model, system_prompt in ((self.extract_model, ANALYZE_SYSTEM_PROMPT),
+                                         (self.chat_model, QUERY_SYSTEM_PROMPT)):
+                # Load weights and keep them resident so the first request is not a cold start
+                self.client.generate(
+                    model=model,
+                    prompt='',
+                    keep_alive=self.keep_alive,
+                    options={'num_predict': 1}
+                )
+
+                self.client.chat(
+                    model=model,
+                    messages=[
+                        {'role': 'system', 'content': system_prompt},
+                        {'role': 'user', 'content': 'ping'}
+                    ],
+                    keep_alive=self.keep_alive,
+                    options={'num_predict': 1}
+                )
+                print(f"Warmed up model: {model} (keep_alive={self.keep_alive})")
+            return True
 
-            # Check if our model is available
-            model_names = [m['name'] for m in models.get('models', [])]
-            if not any(self.model in name for name in model_names):
-                print(f"Warning: Model '{self.model}' not found. Available models: {model_names}")
-                print(f"Download it with: ollama pull {self.model}")
-                return False
+        except Exception as e:
+            print(f"Model warm-up failed: {str(e)}")
+            return False
 
-            return True
+    def check_ollama_connection(self):
+        """Check if Ollama is running and both models are available (cached briefly)"""
+        if self._connection_status:
+            checked_at, result = self._connection_status
+            if time.monotonic() - checked_at < CONNECTION_CHECK_TTL_SECONDS:
+                return result
+
+        result = self._check_ollama_models()
+        self._connection_status = (time.monotonic(), result)
+        return result
+
+    def _check_ollama_models(self):
+        """List Ollama's models and verify ours are pulled"""
+        try:
+            # Try to list models
+            models = self.client.list()
+            model_names = [m['model'] for m in models.get('models', [])]
+            print(f"Ollama is running. Available models: {model_names}")
+
+            available = True
+            for model in dict.fromkeys((self.extract_model, self.chat_model)):
+                # Check if the model is available
+                matches = [m for m in models.get('models', []) if model in m['model']]
+                if not matches:
+                    print(f"Warning: Model '{model}' not found. Available models: {model_names}")
+                    print(f"Download it with: ollama pull {model}")
+                    available = False
+                    continue
+
+                # Q4_K_M/Q5_K_M give the best speed/accuracy tradeoff on CPU
+                quantization = matches[0]['details']['quantization_level']
+                if quantization not in RECOMMENDED_QUANTIZATIONS:
+                    print(f"Warning: Model '{model}' uses {quantization} quantization; "
+                          f"{' or '.join(RECOMMENDED_QUANTIZATIONS)} is recommended for faster inference")
+
+            return available
 
         except Exception as e:
             print(f"Ollama connection failed: {str(e)}")
@@ -222,7 +349,7 @@ def test_analyzer():
         print("\nPlease install and start Ollama:")
         print("1. Install: https://ollama.ai/download")
         print("2. Run: ollama serve")
-        print("3. Pull model: ollama pull llama3.1")
+        print("3. Pull models: ollama pull llama3.1:8b-instruct-q4_K_M && ollama pull llama3.2:3b-instruct-q4_K_M")
         return
 
     # Test analysis
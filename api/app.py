@@ -6,13 +6,20 @@ Handles authentication, queries, and patient portal
 import os
 import json
 import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+import ollama
 from dotenv import load_dotenv
+from sqlalchemy import func
 
-from database import DatabaseManager, Patient, Session, EntityIndex
-from ai_analyzer import AIAnalyzer
+from database import DatabaseManager, Patient, Consent, Session, EntityIndex, compute_file_hash
+from ai_analyzer import AIAnalyzer, QUERY_FALLBACK_ANSWER
+from query_cache import QueryCache
 
 # Load environment variables
 load_dotenv()
@@ -27,12 +34,59 @@ DB_PATH = os.getenv('DATABASE_PATH', './data/consent_system.db')
 db_manager = DatabaseManager(DB_PATH)
 
 # Initialize AI analyzer
-OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.1')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3.1:8b-instruct-q4_K_M')
+OLLAMA_EXTRACT_MODEL = os.getenv('OLLAMA_EXTRACT_MODEL', 'llama3.2:3b-instruct-q4_K_M')
 OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
-ai_analyzer = AIAnalyzer(model=OLLAMA_MODEL, host=OLLAMA_HOST)
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '-1')
+# One HTTP connection pool to Ollama, shared by analysis, answers and the query cache
+ollama_client = ollama.Client(host=OLLAMA_HOST)
+ai_analyzer = AIAnalyzer(
+    chat_model=OLLAMA_MODEL,
+    extract_model=OLLAMA_EXTRACT_MODEL,
+    host=OLLAMA_HOST,
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    client=ollama_client
+)
+
+# Initialize semantic answer cache for repeated questions
+query_cache = QueryCache(
+    embed_model=os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text'),
+    host=OLLAMA_HOST,
+    threshold=float(os.getenv('QUERY_CACHE_THRESHOLD', 0.9)),
+    client=ollama_client
+)
 
 # Configuration
 SESSION_EXPIRY_HOURS = int(os.getenv('SESSION_EXPIRY_HOURS', 8))
+SESSION_PURGE_INTERVAL_MINUTES = int(os.getenv('SESSION_PURGE_INTERVAL_MINUTES', 10))
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 2))
+UPLOAD_JOB_TTL_SECONDS = 3600
+
+# Background upload jobs: OCR + AI analysis run off the request thread
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS)
+upload_jobs = {}  # job_id -> {'patient_id', 'status', 'result', 'error', 'finished_at'}
+upload_jobs_lock = threading.Lock()
+
+
+def start_session_sweeper():
+    """Periodically delete expired sessions so the sessions table stays small"""
+    def sweep():
+        while True:
+            time.sleep(SESSION_PURGE_INTERVAL_MINUTES * 60)
+            try:
+                removed = db_manager.purge_expired_sessions()
+                if removed:
+                    print(f"Purged {removed} expired sessions")
+            except Exception as e:
+                print(f"Session purge error: {str(e)}")
+
+    threading.Thread(target=sweep, name='session-sweeper', daemon=True).start()
+
+
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """Return the request's database session to the pool"""
+    db_manager.Session.remove()
 
 
 # ============================================================================
@@ -55,14 +109,17 @@ def login():
         patient = db_session.query(Patient).filter(Patient.email == email).first()
 
         if not patient:
-            db_session.close()
             return jsonify({'error': 'Invalid credentials'}), 401
 
         # Verify password
         if not patient.check_password(password):
-            db_session.close()
             return jsonify({'error': 'Invalid credentials'}), 401
 
+        # Migrate bcrypt hashes to argon2id now that we know the plaintext
+        # (saved by the commit below)
+        if patient.password_needs_rehash():
+            patient.set_password(password)
+
         # Create session token
         session_token = secrets.token_urlsafe(32)
         expires_at = datetime.utcnow() + timedelta(hours=SESSION_EXPIRY_HOURS)
@@ -83,7 +140,6 @@ def login():
             'expires_at': expires_at.isoformat()
         }
 
-        db_session.close()
         return jsonify(response_data), 200
 
     except Exception as e:
@@ -107,7 +163,6 @@ def logout():
             db_session.delete(session)
             db_session.commit()
 
-        db_session.close()
         return jsonify({'success': True}), 200
 
     except Exception as e:
@@ -115,41 +170,65 @@ def logout():
         return jsonify({'error': 'Logout failed'}), 500
 
 
-def validate_session(session_token):
-    """Validate session token and return patient_id"""
+def validate_session(session_token, db_session):
+    """Validate session token and return patient_id, reusing the caller's db_session"""
     if not session_token:
         return None
 
-    db_session = db_manager.get_session()
-    session = db_session.query(Session).filter(Session.session_token == session_token).first()
+    # Select only indexed columns so the lookup is served by idx_sess_token_expires_pid
+    session = db_session.query(Session.patient_id, Session.expires_at).filter(
+        Session.session_token == session_token
+    ).first()
 
     if not session:
-        db_session.close()
         return None
 
     # Check if expired
     if session.expires_at < datetime.utcnow():
-        db_session.delete(session)
+        db_session.query(Session).filter(Session.session_token == session_token).delete()
         db_session.commit()
-        db_session.close()
         return None
 
-    patient_id = session.patient_id
-    db_session.close()
-    return patient_id
+    return session.patient_id
 
 
 # ============================================================================
 # QUERY ENDPOINTS
 # ============================================================================
 
+NO_CONSENTS_ANSWER = ('I could not find any consent forms associated with your account. '
+                      'Please contact your healthcare provider if you believe this is an error.')
+
+
+def stream_answer(pieces):
+    """
+    Send answer pieces to the client as Server-Sent Events, ending with [DONE]
+
+    If the pieces fail partway, an {"error": ...} event is sent before [DONE]
+    so the client can discard the partial answer.
+    """
+    def events():
+        token_count = 0
+        try:
+            for piece in pieces:
+                token_count += 1
+                yield f"data: {json.dumps({'token': piece})}\n\n"
+        except Exception:
+            yield f"data: {json.dumps({'error': QUERY_FALLBACK_ANSWER})}\n\n"
+        print(f"Streamed {token_count} tokens")
+        yield "data: [DONE]\n\n"
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream')
+
+
 @app.route('/api/query', methods=['POST'])
 def query():
-    """Process patient query"""
+    """Process patient query, streaming the answer as Server-Sent Events"""
     try:
         # Validate session
         session_token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        patient_id = validate_session(session_token)
+        db_session = db_manager.get_session()
+        patient_id = validate_session(session_token, db_session)
 
         if not patient_id:
             return jsonify({'error': 'Invalid or expired session'}), 401
@@ -161,25 +240,30 @@ def query():
         if not query_text:
             return jsonify({'error': 'Query text required'}), 400
 
-        # Get patient's consent data
-        db_session = db_manager.get_session()
-        patient = db_session.query(Patient).filter(Patient.id == patient_id).first()
+        # Answer repeated questions from the cache
+        query_embedding = query_cache.embed(query_text)
+        cached_answer = query_cache.lookup(patient_id, query_embedding)
 
-        if not patient:
+        if cached_answer:
             db_session.close()
+            return stream_answer([cached_answer])
+
+        # An upload committed while the answer streams invalidates this generation
+        cache_generation = query_cache.generation(patient_id)
+
+        # Get the patient and all of their consent forms in one query
+        rows = db_session.query(Patient.id, EntityIndex).outerjoin(
+            EntityIndex, EntityIndex.patient_id == Patient.id
+        ).filter(Patient.id == patient_id).all()
+
+        if not rows:
             return jsonify({'error': 'Patient not found'}), 404
 
-        # Get all consent forms for this patient
-        consents = db_session.query(EntityIndex).filter(
-            EntityIndex.patient_id == patient_id
-        ).all()
+        consents = [consent for _, consent in rows if consent is not None]
 
         if not consents:
             db_session.close()
-            return jsonify({
-                'answer': 'I could not find any consent forms associated with your account. '
-                         'Please contact your healthcare provider if you believe this is an error.'
-            }), 200
+            return stream_answer([NO_CONSENTS_ANSWER])
 
         # Format consent data for AI
         consent_data = []
@@ -190,21 +274,26 @@ def query():
                 'doctor_name': consent.doctor_name,
                 'procedure': consent.procedure,
                 'procedure_date': consent.procedure_date,
-                'consented_items': json.loads(consent.consented_items) if consent.consented_items else [],
-                'declined_items': json.loads(consent.declined_items) if consent.declined_items else [],
+                'consented_items': consent.consented_items or [],
+                'declined_items': consent.declined_items or [],
                 'summary': consent.summary
             }
             consent_data.append(consent_dict)
 
+        # stream_with_context defers teardown until the stream ends, so return the
+        # pooled connection (and end its read transaction) before generation starts
         db_session.close()
 
-        # Get AI answer
-        answer = ai_analyzer.answer_query(query_text, consent_data)
+        # Stream AI answer; a failed stream raises before reaching the cache
+        def generate_answer():
+            pieces = []
+            for piece in ai_analyzer.stream_answer_query(query_text, consent_data):
+                pieces.append(piece)
+                yield piece
 
-        return jsonify({
-            'answer': answer,
-            'query': query_text
-        }), 200
+            query_cache.store(patient_id, query_embedding, ''.join(pieces).strip(), cache_generation)
+
+        return stream_answer(generate_answer())
 
     except Exception as e:
         print(f"Query error: {str(e)}")
@@ -225,7 +314,8 @@ def health():
         'status': 'healthy',
         'database': 'connected',
         'ollama': 'connected' if ollama_status else 'disconnected',
-        'model': OLLAMA_MODEL
+        'model': OLLAMA_MODEL,
+        'extract_model': OLLAMA_EXTRACT_MODEL
     }), 200
 
 
@@ -234,24 +324,21 @@ def stats():
     """Get system statistics (requires authentication)"""
     try:
         session_token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        patient_id = validate_session(session_token)
+        db_session = db_manager.get_session()
+        patient_id = validate_session(session_token, db_session)
 
         if not patient_id:
             return jsonify({'error': 'Invalid or expired session'}), 401
 
-        db_session = db_manager.get_session()
-
-        # Get patient's consent count
-        consent_count = db_session.query(EntityIndex).filter(
-            EntityIndex.patient_id == patient_id
-        ).count()
-
-        patient = db_session.query(Patient).filter(Patient.id == patient_id).first()
-
-        db_session.close()
+        # Get patient info and consent count in one query
+        patient = db_session.query(
+            Patient.patient_name, Patient.email, func.count(EntityIndex.id)
+        ).outerjoin(
+            EntityIndex, EntityIndex.patient_id == Patient.id
+        ).filter(Patient.id == patient_id).group_by(Patient.id).first()
 
         return jsonify({
-            'consent_forms': consent_count,
+            'consent_forms': patient[2] if patient else 0,
             'patient_name': patient.patient_name if patient else 'Unknown',
             'email': patient.email if patient else 'Unknown'
         }), 200
@@ -263,75 +350,215 @@ def stats():
 
 @app.route('/api/upload', methods=['POST'])
 def upload_consent():
-    """Upload and process consent PDF"""
+    """Upload one or more consent PDFs and queue them for processing"""
     try:
         # Validate session
         session_token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        patient_id = validate_session(session_token)
+        db_session = db_manager.get_session()
+        patient_id = validate_session(session_token, db_session)
 
         if not patient_id:
             return jsonify({'error': 'Invalid or expired session'}), 401
 
-        # Check if file was uploaded
-        if 'file' not in request.files:
+        # Check if files were uploaded ('files' for batches, 'file' for a single PDF)
+        files = request.files.getlist('files') or request.files.getlist('file')
+
+        if not files:
             return jsonify({'error': 'No file uploaded'}), 400
 
-        file = request.files['file']
+        for file in files:
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
 
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+            if not file.filename.lower().endswith('.pdf'):
+                return jsonify({'error': 'Only PDF files are allowed'}), 400
+
+        # Hash each PDF so forms this patient already uploaded skip OCR and AI
+        new_files = {}
+        for file in files:
+            file_hash = compute_file_hash(file.stream)
+            file.stream.seek(0)
+            new_files.setdefault(file_hash, file)
+
+        existing = db_session.query(Consent).filter(
+            Consent.patient_id == patient_id,
+            Consent.file_hash.in_(list(new_files))
+        ).all()
+        duplicates = [json.loads(consent.ai_analysis_json) for consent in existing
+                      if new_files.pop(consent.file_hash, None)]
 
-        if not file.filename.lower().endswith('.pdf'):
-            return jsonify({'error': 'Only PDF files are allowed'}), 400
+        if not new_files:
+            print(f"Skipping {len(files)} already processed PDF(s)")
+            return jsonify({
+                'success': True,
+                'message': f'{len(duplicates)} consent form(s) already processed',
+                'analysis': duplicates[0],
+                'analyses': duplicates
+            }), 200
 
-        # Save uploaded file
+        # Save uploaded files
         upload_folder = os.getenv('UPLOAD_FOLDER', './uploads')
         os.makedirs(upload_folder, exist_ok=True)
 
         from werkzeug.utils import secure_filename
-        import uuid
-
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
 
-        # Process PDF
-        from ocr_processor import OCRProcessor
+        uploads = []
+        for file_hash, file in new_files.items():
+            # Generate unique filename
+            unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
+            file_path = os.path.join(upload_folder, unique_filename)
+            file.save(file_path)
+            uploads.append((file.filename, file_path, file_hash))
 
-        ocr = OCRProcessor(ocr_engine='auto')
-        print(f"Processing uploaded PDF: {file.filename}")
+        # Process PDFs in the background; the client polls /api/upload/status/<job_id>
+        job_id = submit_upload_job(patient_id, uploads)
 
-        # Extract text
-        text = ocr.extract_text_from_pdf(file_path)
+        return jsonify({
+            'success': True,
+            'message': f'{len(uploads)} consent form(s) queued for processing',
+            'job_id': job_id,
+            'duplicates': len(files) - len(uploads)
+        }), 202
 
-        if not text or len(text) < 50:
-            os.remove(file_path)  # Clean up
-            return jsonify({'error': 'Could not extract text from PDF'}), 400
+    except Exception as e:
+        print(f"Upload error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to process PDF: {str(e)}'}), 500
 
-        # Analyze with AI
-        analysis = ai_analyzer.analyze_consent_form(text)
 
-        # Get patient info
+@app.route('/api/upload/status/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """Get the status of a background upload job"""
+    try:
+        session_token = request.headers.get('Authorization', '').replace('Bearer ', '')
         db_session = db_manager.get_session()
-        patient = db_session.query(Patient).filter(Patient.id == patient_id).first()
+        patient_id = validate_session(session_token, db_session)
+
+        if not patient_id:
+            return jsonify({'error': 'Invalid or expired session'}), 401
+
+        with upload_jobs_lock:
+            job = upload_jobs.get(job_id)
+
+        # Never reveal other patients' jobs
+        if not job or job['patient_id'] != patient_id:
+            return jsonify({'error': 'Upload job not found'}), 404
+
+        response_data = {'job_id': job_id, 'status': job['status']}
+        if job['status'] == 'finished':
+            response_data['result'] = job['result']
+        elif job['status'] == 'failed':
+            response_data['error'] = job['error']
+
+        return jsonify(response_data), 200
+
+    except Exception as e:
+        print(f"Upload status error: {str(e)}")
+        return jsonify({'error': 'Failed to get upload status'}), 500
+
+
+def submit_upload_job(patient_id, uploads):
+    """Queue uploaded PDFs for processing and return the job id"""
+    job_id = uuid.uuid4().hex
+
+    with upload_jobs_lock:
+        # Forget jobs whose results have been available for a while
+        cutoff = time.monotonic() - UPLOAD_JOB_TTL_SECONDS
+        for stale_id in [jid for jid, job in upload_jobs.items()
+                         if job['finished_at'] and job['finished_at'] < cutoff]:
+            del upload_jobs[stale_id]
+
+        upload_jobs[job_id] = {
+            'patient_id': patient_id,
+            'status': 'queued',
+            'result': None,
+            'error': None,
+            'finished_at': None
+        }
+
+    upload_executor.submit(run_upload_job, job_id, patient_id, uploads)
+    return job_id
+
+
+def run_upload_job(job_id, patient_id, uploads):
+    """Worker entry point: process an upload job and record its outcome"""
+    with upload_jobs_lock:
+        upload_jobs[job_id]['status'] = 'started'
+
+    try:
+        result = process_consent_pdfs(patient_id, uploads)
+        outcome = {'status': 'finished', 'result': result}
+    except Exception as e:
+        print(f"Upload job {job_id} failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        outcome = {'status': 'failed', 'error': f'Failed to process PDF: {str(e)}'}
+    finally:
+        # Worker threads get their own scoped session; release it
+        db_manager.Session.remove()
+
+    with upload_jobs_lock:
+        upload_jobs[job_id].update(outcome, finished_at=time.monotonic())
+
+
+def process_consent_pdfs(patient_id, uploads):
+    """
+    OCR, analyze and store uploaded consent PDFs
+
+    Args:
+        patient_id: Patient the forms belong to
+        uploads: List of (original filename, saved file path, file hash) tuples
+
+    Returns:
+        dict: Job result with the analysis of each form
+    """
+    from ocr_processor import OCRProcessor
 
-        # Store in database
-        from database import Consent, EntityIndex
+    filenames = [filename for filename, _, _ in uploads]
+    file_paths = [file_path for _, file_path, _ in uploads]
+    file_hashes = [file_hash for _, _, file_hash in uploads]
+
+    # The files are OCR'd at the same time, so split the cores between them rather than
+    # letting each one start a pdftoppm per core; the shared Tesseract pool keeps every core
+    cpu_count = os.cpu_count() or 1
+    ocr = OCRProcessor(ocr_engine='auto', max_workers=max(1, cpu_count // len(file_paths)),
+                       pool_workers=cpu_count)
+    print(f"Processing uploaded PDFs: {', '.join(filenames)}")
+
+    # Extract text from all PDFs in parallel (Tesseract and pdftoppm run as subprocesses)
+    with ThreadPoolExecutor(max_workers=min(len(file_paths), cpu_count)) as executor:
+        texts = list(executor.map(ocr.extract_text_from_pdf, file_paths))
+
+    for filename, ocr_text in zip(filenames, texts):
+        if not ocr_text or len(ocr_text) < 50:
+            for path in file_paths:
+                os.remove(path)  # Clean up
+            raise ValueError(f'Could not extract text from PDF: {filename}')
+
+    # Analyze with AI (all forms are sent to Ollama concurrently)
+    analyses = ai_analyzer.analyze_consent_forms(texts)
+
+    # Get patient info
+    db_session = db_manager.get_session()
+    patient = db_session.query(Patient).filter(Patient.id == patient_id).first()
 
+    # Store in database
+    records = []
+    now = datetime.utcnow()  # Shared by every consent in this upload and its entity index
+    for filename, file_hash, ocr_text, analysis in zip(filenames, file_hashes, texts, analyses):
         consent = Consent(
             patient_id=patient_id,
-            filename=file.filename,
-            full_text=text,
+            filename=filename,
+            full_text_path=db_manager.save_full_text(file_hash, ocr_text),
             ai_analysis_json=json.dumps(analysis),
-            processed_timestamp=datetime.utcnow()
+            file_hash=file_hash,
+            processed_timestamp=now
         )
-        db_session.add(consent)
-        db_session.commit()
 
-        # Create entity index
+        # Create entity index (consent_id is filled in when the consent is inserted)
         entity = EntityIndex(
-            consent_id=consent.id,
+            consent=consent,
             patient_id=patient_id,
             patient_name=analysis.get('patient_name', patient.patient_name),
             patient_email=analysis.get('patient_email', patient.email),
@@ -339,8 +566,8 @@ def upload_consent():
             doctor_name=analysis.get('doctor_name'),
             procedure=analysis.get('procedure'),
             procedure_date=analysis.get('procedure_date'),
-            consented_items=json.dumps(analysis.get('consented_items', [])),
-            declined_items=json.dumps(analysis.get('declined_items', [])),
+            consented_items=analysis.get('consented_items', []),
+            declined_items=analysis.get('declined_items', []),
             summary=analysis.get('summary', ''),
             search_terms=' '.join([
                 str(analysis.get('patient_name', '')),
@@ -348,23 +575,32 @@ def upload_consent():
                 str(analysis.get('procedure', '')),
                 ' '.join(analysis.get('consented_items', []))
             ]).lower(),
-            processed_timestamp=datetime.utcnow()
+            processed_timestamp=now
         )
-        db_session.add(entity)
+        records.extend([consent, entity])
+
+    # Insert every consent and entity row in a single transaction; entity
+    # consent_ids are assigned during the same flush, so nothing is left
+    # half-written if any insert fails
+    try:
+        db_session.add_all(records)
         db_session.commit()
-        db_session.close()
+    except Exception:
+        db_session.rollback()
+        # Don't leave OCR text files behind for consents that were never stored
+        for record in records:
+            if isinstance(record, Consent):
+                db_manager.discard_full_text(record.full_text_path)
+        raise
 
-        return jsonify({
-            'success': True,
-            'message': 'Consent form processed successfully',
-            'analysis': analysis
-        }), 200
+    # Cached answers may no longer reflect the patient's consent forms
+    query_cache.invalidate(patient_id)
 
-    except Exception as e:
-        print(f"Upload error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': f'Failed to process PDF: {str(e)}'}), 500
+    return {
+        'message': f'{len(analyses)} consent form(s) processed successfully',
+        'analysis': analyses[0],
+        'analyses': analyses
+    }
 
 
 # ============================================================================
@@ -389,6 +625,7 @@ if __name__ == '__main__':
     # Initialize database
     print("Initializing database...")
     db_manager.init_db()
+    start_session_sweeper()
 
     # Check Ollama connection
     print("\nChecking Ollama connection...")
@@ -396,8 +633,12 @@ if __name__ == '__main__':
         print("\nWARNING: Ollama is not running or model not found!")
         print("1. Install Ollama: https://ollama.ai/download")
         print("2. Start Ollama: ollama serve")
-        print(f"3. Pull model: ollama pull {OLLAMA_MODEL}")
+        print(f"3. Pull models: ollama pull {OLLAMA_MODEL} && ollama pull {OLLAMA_EXTRACT_MODEL}")
         print("\nAPI will start but AI features won't work until Ollama is running.\n")
+    else:
+        # Load the model before serving so the first request sees a hot model
+        print("\nWarming up model...")
+        ai_analyzer.warm_up()
 
     # Start Flask app
     host = os.getenv('API_HOST', '0.0.0.0')
@@ -409,7 +650,9 @@ if __name__ == '__main__':
     print(f"Server: http://{host}:{port}")
     print(f"Health check: http://{host}:{port}/api/health")
     print(f"Database: {DB_PATH}")
-    print(f"AI Model: {OLLAMA_MODEL}")
+    print(f"AI Models: {OLLAMA_MODEL} (chat), {OLLAMA_EXTRACT_MODEL} (extraction)")
+    print("Ollama tuning (set before 'ollama serve' for concurrent uploads/queries):")
+    print("  OLLAMA_NUM_PARALLEL=4 OLLAMA_MAX_LOADED_MODELS=2")
     print(f"{'='*60}\n")
 
     app.run(host=host, port=port, debug=True)
@@ -3,15 +3,24 @@ Database models and schema for Free Consent Management System
 Uses SQLite with SQLAlchemy ORM
 """
 
+import hashlib
 import os
+import threading
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import create_engine, event, delete, inspect, select, text, Column, Integer, String, Text, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, scoped_session
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import bcrypt
+import zstandard
 
 Base = declarative_base()
 
+# argon2id with OWASP's minimum parameters (19 MiB, 2 passes): far cheaper per
+# login than bcrypt cost 12 at comparable strength for 8-hour sessions
+PASSWORD_HASHER = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=1)
+
 
 class Patient(Base):
     """Patient authentication and profile"""
@@ -29,11 +38,25 @@ class Patient(Base):
 
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        self.password_hash = PASSWORD_HASHER.hash(password)
 
     def check_password(self, password):
-        """Verify password"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Verify password (argon2id, or legacy bcrypt hashes)"""
+        if self._has_bcrypt_hash():
+            return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+
+        try:
+            return PASSWORD_HASHER.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def password_needs_rehash(self):
+        """Check if the stored hash is bcrypt or uses outdated argon2 parameters"""
+        return self._has_bcrypt_hash() or PASSWORD_HASHER.check_needs_rehash(self.password_hash)
+
+    def _has_bcrypt_hash(self):
+        """Check if the password was hashed with bcrypt ($2a$/$2b$/$2y$ prefix)"""
+        return self.password_hash.startswith('$2')
 
 
 class Consent(Base):
@@ -43,8 +66,10 @@ class Consent(Base):
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False, index=True)
     filename = Column(String(255), nullable=False)
-    full_text = Column(Text, nullable=False)
+    full_text = Column(Text, default='')  # Inline text of older rows; new rows use full_text_path
+    full_text_path = Column(String(512))  # zstd-compressed OCR text file, relative to text_dir
     ai_analysis_json = Column(Text)  # JSON string
+    file_hash = Column(String(32), index=True)  # BLAKE2b-128 of the PDF, for duplicate detection
     processed_timestamp = Column(DateTime, default=datetime.utcnow)
 
     # Relationship
@@ -71,8 +96,8 @@ class EntityIndex(Base):
     procedure_date = Column(String(50))
 
     # Consent details
-    consented_items = Column(Text)  # JSON array as string
-    declined_items = Column(Text)   # JSON array as string
+    consented_items = Column(JSON)  # List of items, decoded by the driver
+    declined_items = Column(JSON)   # List of items, decoded by the driver
     summary = Column(Text)
 
     # Search optimization
@@ -89,9 +114,38 @@ class Session(Base):
 
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False, index=True)
-    session_token = Column(String(255), unique=True, nullable=False, index=True)
+    session_token = Column(String(64), nullable=False)  # token_urlsafe(32) is 43 chars
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    # The only index on session_token, so SQLite always picks it, and covering, so
+    # validate_session reads expires_at/patient_id without touching the table.
+    # SQLite cannot make a prefix of an index unique, so only the whole triple is;
+    # the token itself is not enforced unique (token_urlsafe(32) does not collide)
+    __table_args__ = (
+        Index('idx_sess_token_expires_pid', 'session_token', 'expires_at', 'patient_id', unique=True),
+    )
+
+
+# Applied to every new SQLite connection: WAL lets readers run during writes and
+# synchronous=NORMAL avoids an fsync per commit (still durable at checkpoints)
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout=5000',
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune a freshly opened SQLite connection"""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
 
 
 class DatabaseManager:
@@ -100,20 +154,105 @@ class DatabaseManager:
     def __init__(self, db_path='./data/consent_system.db'):
         """Initialize database connection"""
         os.makedirs(os.path.dirname(db_path) if os.path.dirname(db_path) else 'data', exist_ok=True)
-        self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        # OCR text is kept out of the consents table, next to the database file
+        self.text_dir = os.path.join(os.path.dirname(db_path) or 'data', 'consent_texts')
+        os.makedirs(self.text_dir, exist_ok=True)
+        # SQLite file databases use a QueuePool, so connections are reused across requests
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            echo=False,
+            connect_args={'check_same_thread': False}
+        )
+        event.listen(self.engine, 'connect', _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
+        self._upgrade_schema()
+        # One session per thread (i.e. per Flask request); call Session.remove() when done
+        self.Session = scoped_session(sessionmaker(bind=self.engine))
+
+    def _upgrade_schema(self):
+        """Add columns and indexes introduced after an existing database was created"""
+        inspector = inspect(self.engine)
+
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing_columns:
+                        column_type = column.type.compile(self.engine.dialect)
+                        connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+            # session_token used to carry its own unique index; with it in place SQLite
+            # keeps choosing it over the covering idx_sess_token_expires_pid
+            connection.execute(text('DROP INDEX IF EXISTS ix_sessions_session_token'))
 
     def get_session(self):
-        """Get a new database session"""
+        """Get the database session for the current thread"""
         return self.Session()
 
+    def save_full_text(self, file_hash, full_text):
+        """
+        Write a consent's OCR text to disk, zstd-compressed
+
+        The text is archived only; nothing reads it back after analysis.
+
+        Args:
+            file_hash: Content hash of the PDF (names the file, so re-uploads share it)
+            full_text: Extracted text
+
+        Returns:
+            str: File name relative to text_dir, to store in Consent.full_text_path
+        """
+        name = f'{file_hash}.txt.zst'
+        path = os.path.join(self.text_dir, name)
+        if not os.path.exists(path):
+            data = zstandard.ZstdCompressor(level=3).compress(full_text.encode('utf-8'))
+            # Write then rename so a concurrent reader never sees a partial file
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return name
+
+    def discard_full_text(self, name):
+        """Delete a saved OCR text file after a failed commit, unless a stored consent uses it"""
+        with self.engine.connect() as connection:
+            in_use = connection.execute(
+                select(Consent.id).where(Consent.full_text_path.endswith(name, autoescape=True)).limit(1)
+            ).first()
+        if not in_use:
+            try:
+                os.remove(os.path.join(self.text_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def purge_expired_sessions(self):
+        """Delete expired sessions and return how many were removed"""
+        with self.engine.begin() as connection:
+            result = connection.execute(delete(Session).where(Session.expires_at < datetime.utcnow()))
+        return result.rowcount
+
     def init_db(self):
         """Initialize/reset database"""
         Base.metadata.create_all(self.engine)
         print("Database initialized successfully!")
 
 
+def compute_file_hash(fileobj):
+    """
+    Hash a binary file object to detect duplicate consent PDFs
+
+    Args:
+        fileobj: File opened in binary mode (read from its current position)
+
+    Returns:
+        str: 32-character BLAKE2b-128 hex digest
+    """
+    return hashlib.file_digest(fileobj, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+
 # Initialize database
 def init_database(db_path='./data/consent_system.db'):
     """Initialize database with schema"""
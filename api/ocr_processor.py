@@ -1,26 +1,143 @@
 """
 OCR Processing Module - Free Implementation
-Supports both digital PDFs (pdfplumber) and scanned PDFs (Tesseract)
+Supports both digital PDFs (PyMuPDF / pdfplumber) and scanned PDFs (Tesseract)
 """
 
+import multiprocessing
 import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
 import pdfplumber
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 
+# One Tesseract thread per OCR worker. OpenMP reads this when tesserocr loads libtesseract,
+# which happens here (and in the forkserver preload), before any worker initializer runs
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+try:
+    import tesserocr  # Optional: in-process Tesseract API, avoids one CLI launch per page
+except ImportError:
+    tesserocr = None
+
+# Separator emitted before each page's text
+PAGE_HEADER = "\n--- Page %d ---\n"
+
+# LSTM-only engine; consent forms are read as one uniform block of text
+TESSERACT_CONFIG = '--oem 1 --psm 6'
+
+
+# Per-process tesserocr API, created by _init_ocr_worker when tesserocr is installed
+_tess_api = None
+
+# Process-wide OCR worker pool shared by every PDF, created on first use
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool(max_workers):
+    """Return the shared OCR worker pool, creating it with max_workers on first use"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            # Start workers from a clean forkserver (spawn where unavailable) rather than
+            # fork()ing the caller, which in the API is multi-threaded and may hold locks
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                # Import this module and its OCR dependencies once in the forkserver, so forked
+                # workers start warm; each worker still re-imports the caller's main module
+                # (app.py in the API) as __mp_main__
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=context,
+                initializer=_init_ocr_worker
+            )
+        return _ocr_pool
+
+
+def _discard_ocr_pool(pool):
+    """Drop a broken pool (e.g. a worker crashed) so the next PDF gets fresh workers"""
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_ocr_worker():
+    """Limit each OCR worker process to one Tesseract thread and load its model once"""
+    global _tess_api
+    os.environ['OMP_THREAD_LIMIT'] = '1'  # For tesseract CLI subprocesses
+    if tesserocr:
+        _tess_api = tesserocr.PyTessBaseAPI(
+            lang='eng',
+            oem=tesserocr.OEM.LSTM_ONLY,
+            psm=tesserocr.PSM.SINGLE_BLOCK
+        )
+
+
+def _ocr_page(image_path):
+    """OCR one rendered page image file in a worker process"""
+    with Image.open(image_path) as page:
+        image = _binarize(page)
+    if _tess_api:
+        _tess_api.SetImage(image)
+        return _tess_api.GetUTF8Text()
+    return pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
+
+
+def _binarize(image):
+    """Convert an image to 1-bit black and white using Otsu's threshold"""
+    gray = image.convert('L')
+    histogram = gray.histogram()
+    total = sum(histogram)
+    total_sum = sum(level * count for level, count in enumerate(histogram))
+
+    # Pick the threshold that maximizes the variance between dark and light pixels
+    best_threshold, best_variance = 127, 0.0
+    dark_count = dark_sum = 0
+    for level, count in enumerate(histogram):
+        dark_count += count
+        light_count = total - dark_count
+        if not dark_count:
+            continue
+        if not light_count:
+            break
+        dark_sum += level * count
+        mean_gap = dark_sum / dark_count - (total_sum - dark_sum) / light_count
+        variance = dark_count * light_count * mean_gap * mean_gap
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+
+    return gray.point(lambda value: 255 if value > best_threshold else 0, mode='1')
+
 
 class OCRProcessor:
     """Handle PDF text extraction using free OCR tools"""
 
-    def __init__(self, ocr_engine='pdfplumber'):
+    def __init__(self, ocr_engine='pymupdf', max_workers=None, pool_workers=None):
         """
         Initialize OCR processor
 
         Args:
-            ocr_engine: 'pdfplumber' for digital PDFs, 'tesseract' for scanned PDFs
+            ocr_engine: 'pymupdf' or 'pdfplumber' for digital PDFs, 'tesseract' for scanned PDFs,
+                        'auto' to try PyMuPDF and fall back to Tesseract
+            max_workers: CPU budget for one scanned PDF (pages in flight and pdftoppm threads),
+                         defaults to all cores
+            pool_workers: Size of the process-wide OCR pool if this processor creates it,
+                          defaults to max_workers; the pool is sized on first use
         """
         self.ocr_engine = ocr_engine
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pool_workers = pool_workers or self.max_workers
 
     def extract_text_from_pdf(self, pdf_path):
         """
@@ -35,23 +152,79 @@ class OCRProcessor:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-        if self.ocr_engine == 'pdfplumber':
+        if self.ocr_engine == 'pymupdf':
+            return self._extract_with_pymupdf(pdf_path)
+        elif self.ocr_engine == 'pdfplumber':
             return self._extract_with_pdfplumber(pdf_path)
         elif self.ocr_engine == 'tesseract':
             return self._extract_with_tesseract(pdf_path)
         else:
-            # Auto-detect: try pdfplumber first, fall back to tesseract
+            # Auto-detect: a first page without text skips straight to Tesseract;
+            # otherwise the whole PyMuPDF result must still have meaningful text
+            try:
+                is_digital = self._probe_is_digital(pdf_path)
+            except Exception as e:
+                print(f"PyMuPDF failed: {e}, trying Tesseract...")
+                return self._extract_with_tesseract(pdf_path)
+
+            if not is_digital:
+                print("First page has minimal text, using Tesseract...")
+                return self._extract_with_tesseract(pdf_path)
+
             try:
-                text = self._extract_with_pdfplumber(pdf_path)
-                if len(text.strip()) > 50:  # If we got meaningful text
-                    return text
-                else:
-                    print("pdfplumber returned minimal text, trying Tesseract...")
-                    return self._extract_with_tesseract(pdf_path)
+                text = self._extract_with_pymupdf(pdf_path)
             except Exception as e:
-                print(f"pdfplumber failed: {e}, trying Tesseract...")
+                print(f"{e}, trying Tesseract...")
                 return self._extract_with_tesseract(pdf_path)
 
+            if len(text.strip()) > 50:  # If we got meaningful text
+                return text
+            print("PyMuPDF returned minimal text, trying Tesseract...")
+            return self._extract_with_tesseract(pdf_path)
+
+    def _probe_is_digital(self, pdf_path):
+        """
+        Check whether a PDF has selectable text by extracting only its first page
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            bool: True if the first page has meaningful text
+        """
+        with fitz.open(pdf_path) as doc:
+            if not doc.page_count:
+                return False
+            return len(doc[0].get_text("text").strip()) > 50
+
+    def _extract_with_pymupdf(self, pdf_path):
+        """
+        Extract text using PyMuPDF (fastest option for digital PDFs with selectable text)
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            str: Extracted text
+        """
+        print(f"Extracting text with PyMuPDF from: {pdf_path}")
+        text = []
+
+        try:
+            with fitz.open(pdf_path) as doc:
+                for page_num, page in enumerate(doc, 1):
+                    page_text = page.get_text("text")
+                    if page_text.strip():
+                        text.append(PAGE_HEADER % page_num)
+                        text.append(page_text)
+
+            full_text = ''.join(text)
+            print(f"Extracted {len(full_text)} characters using PyMuPDF")
+            return full_text
+
+        except Exception as e:
+            raise Exception(f"PyMuPDF extraction failed: {str(e)}")
+
     def _extract_with_pdfplumber(self, pdf_path):
         """
         Extract text using pdfplumber (best for digital PDFs with selectable text)
@@ -70,7 +243,7 @@ class OCRProcessor:
                 for page_num, page in enumerate(pdf.pages, 1):
                     page_text = page.extract_text()
                     if page_text:
-                        text.append(f"\n--- Page {page_num} ---\n")
+                        text.append(PAGE_HEADER % page_num)
                         text.append(page_text)
 
             full_text = ''.join(text)
@@ -94,16 +267,32 @@ class OCRProcessor:
         text = []
 
         try:
-            # Convert PDF pages to images
-            print("Converting PDF to images...")
-            images = convert_from_path(pdf_path, dpi=300)
-            print(f"Converted {len(images)} pages to images")
-
-            # OCR each page
-            for page_num, image in enumerate(images, 1):
-                print(f"OCR processing page {page_num}/{len(images)}...")
-                page_text = pytesseract.image_to_string(image)
-                text.append(f"\n--- Page {page_num} ---\n")
+            page_count = pdfinfo_from_path(pdf_path)['Pages']
+            workers = self.max_workers
+            print(f"OCR processing {page_count} pages with up to {workers} workers...")
+
+            # Pipeline rendering and OCR: keep at most 2 * workers pages in flight
+            page_texts = []
+            pending = deque()
+            pool = _get_ocr_pool(self.pool_workers)
+            try:
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    # Workers read the rendered JPEGs themselves; only file paths cross processes
+                    for image_path in self._render_pages(pdf_path, page_count, tmpdir, workers):
+                        pending.append(pool.submit(_ocr_page, image_path))
+                        if len(pending) >= 2 * workers:
+                            page_texts.append(pending.popleft().result())
+                    page_texts.extend(future.result() for future in pending)
+            except BrokenProcessPool:
+                _discard_ocr_pool(pool)
+                raise
+            finally:
+                # Don't leave this PDF's pages queued in the shared pool after a failure
+                for future in pending:
+                    future.cancel()
+
+            for page_num, page_text in enumerate(page_texts, 1):
+                text.append(PAGE_HEADER % page_num)
                 text.append(page_text)
 
             full_text = ''.join(text)
@@ -115,6 +304,32 @@ class OCRProcessor:
                           f"Make sure Tesseract is installed: 'brew install tesseract' (macOS) "
                           f"or 'apt-get install tesseract-ocr' (Linux)")
 
+    def _render_pages(self, pdf_path, page_count, output_folder, batch_size):
+        """
+        Render PDF pages to JPEG files, yielding one file path at a time
+
+        Args:
+            pdf_path: Path to PDF file
+            page_count: Number of pages in the PDF
+            output_folder: Directory for the rendered JPEG files
+            batch_size: Pages rendered per pdftoppm call
+
+        Yields:
+            str: Page image paths in page order
+        """
+        for first_page in range(1, page_count + 1, batch_size):
+            last_page = min(first_page + batch_size - 1, page_count)
+            yield from convert_from_path(
+                pdf_path,
+                dpi=300,
+                first_page=first_page,
+                last_page=last_page,
+                thread_count=max(1, self.max_workers - 1),
+                output_folder=output_folder,
+                fmt='jpeg',
+                paths_only=True
+            )
+
     def extract_text_from_image(self, image_path):
         """
         Extract text from a single image using Tesseract
@@ -128,8 +343,8 @@ class OCRProcessor:
         print(f"Extracting text from image: {image_path}")
 
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            image = _binarize(Image.open(image_path))
+            text = pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
             print(f"Extracted {len(text)} characters from image")
             return text
         except Exception as e:
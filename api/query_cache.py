@@ -0,0 +1,110 @@
+"""
+Semantic Query Cache - Reuse answers for repeated patient questions
+Matches questions by embedding similarity so rephrasings hit the same answer
+"""
+
+import threading
+import ollama
+
+
+class QueryCache:
+    """Per-patient cache of (question embedding, answer) pairs"""
+
+    def __init__(self, embed_model='nomic-embed-text', host='http://localhost:11434',
+                 threshold=0.9, max_entries=100, client=None):
+        """
+        Initialize query cache
+
+        Args:
+            embed_model: Ollama embedding model name
+            host: Ollama server URL
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum cached answers kept per patient
+            client: Existing ollama.Client to share (defaults to a new one for host)
+        """
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.client = client or ollama.Client(host=host)
+        self._entries = {}  # patient_id -> list of (unit vector, answer)
+        self._generations = {}  # patient_id -> number of invalidations so far
+        self._lock = threading.Lock()
+
+    def embed(self, text):
+        """
+        Embed a question
+
+        Args:
+            text: Question text
+
+        Returns:
+            list: Unit-length embedding, or None if embedding is unavailable
+        """
+        try:
+            # /api/embed returns L2-normalized vectors
+            return self.client.embed(model=self.embed_model, input=text)['embeddings'][0]
+        except Exception as e:
+            print(f"Query embedding failed: {str(e)}")
+            return None
+
+    def lookup(self, patient_id, embedding):
+        """
+        Find a cached answer to a semantically equivalent question
+
+        Args:
+            patient_id: Patient the question belongs to
+            embedding: Question embedding from embed()
+
+        Returns:
+            str: Cached answer, or None on a miss
+        """
+        if embedding is None:
+            return None
+
+        with self._lock:
+            entries = list(self._entries.get(patient_id, ()))
+
+        best_score, best_answer = 0.0, None
+        for vector, answer in entries:
+            # Vectors are normalized, so the dot product is the cosine similarity
+            score = sum(a * b for a, b in zip(embedding, vector))
+            if score > best_score:
+                best_score, best_answer = score, answer
+
+        if best_score >= self.threshold:
+            print(f"Query cache hit (similarity {best_score:.3f})")
+            return best_answer
+        return None
+
+    def generation(self, patient_id):
+        """Return the patient's cache generation; read it before loading the data an answer uses"""
+        with self._lock:
+            return self._generations.get(patient_id, 0)
+
+    def store(self, patient_id, embedding, answer, generation):
+        """
+        Cache an answer for a patient's question
+
+        Args:
+            patient_id: Patient the question belongs to
+            embedding: Question embedding from embed()
+            answer: Answer text
+            generation: Value of generation() taken before the answer's data was loaded;
+                        the answer is dropped if the cache was invalidated since
+        """
+        if embedding is None:
+            return
+
+        with self._lock:
+            if self._generations.get(patient_id, 0) != generation:
+                return
+            entries = self._entries.setdefault(patient_id, [])
+            entries.append((embedding, answer))
+            del entries[:-self.max_entries]
+
+    def invalidate(self, patient_id):
+        """Drop all cached answers for a patient (e.g. after a new upload)"""
+        with self._lock:
+            self._entries.pop(patient_id, None)
+            # Answers still being generated from the old data must not be stored
+            self._generations[patient_id] = self._generations.get(patient_id, 0) + 1
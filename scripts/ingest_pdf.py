@@ -5,29 +5,64 @@ PDF Ingestion Script - Process consent PDFs and store in database
 import os
 import sys
 import json
+import operator
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from functools import cached_property
 
 # Add parent directory to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api.database import DatabaseManager, Patient, Consent, EntityIndex
+from api.database import DatabaseManager, Patient, Consent, EntityIndex, compute_file_hash
 from api.ocr_processor import OCRProcessor
 from api.ai_analyzer import AIAnalyzer
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Analysis fields read per PDF, fetched with a single C-level call each
+_ENTITY_FIELDS = operator.itemgetter(
+    'patient_name', 'patient_email', 'patient_dob', 'doctor_name', 'procedure',
+    'procedure_date', 'consented_items', 'declined_items', 'summary'
+)
+_SEARCH_FIELDS = operator.itemgetter('patient_name', 'patient_email', 'procedure', 'doctor_name')
+
 
 class PDFIngestionService:
     """Process consent PDFs and populate database"""
 
-    def __init__(self):
-        """Initialize ingestion service"""
-        self.db_manager = DatabaseManager(os.getenv('DATABASE_PATH', './data/consent_system.db'))
-        self.ocr_processor = OCRProcessor(os.getenv('OCR_ENGINE', 'auto'))
-        self.ai_analyzer = AIAnalyzer(
-            model=os.getenv('OLLAMA_MODEL', 'llama3.1'),
-            host=os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+    def __init__(self, ocr_workers=None):
+        """
+        Initialize ingestion service
+
+        Args:
+            ocr_workers: CPU budget for OCR of one scanned PDF (defaults to all cores)
+        """
+        self.ocr_workers = ocr_workers
+
+    # Components are built on first use, so worker processes that only run
+    # OCR + AI never open the database (and vice versa for the parent)
+    @cached_property
+    def db_manager(self):
+        return DatabaseManager(os.getenv('DATABASE_PATH', './data/consent_system.db'))
+
+    @cached_property
+    def db_session(self):
+        """One long-lived session reused for every PDF in a batch"""
+        return self.db_manager.get_session()
+
+    @cached_property
+    def ocr_processor(self):
+        return OCRProcessor(os.getenv('OCR_ENGINE', 'auto'), max_workers=self.ocr_workers)
+
+    @cached_property
+    def ai_analyzer(self):
+        return AIAnalyzer(
+            chat_model=os.getenv('OLLAMA_MODEL', 'llama3.1:8b-instruct-q4_K_M'),
+            extract_model=os.getenv('OLLAMA_EXTRACT_MODEL', 'llama3.2:3b-instruct-q4_K_M'),
+            host=os.getenv('OLLAMA_HOST', 'http://localhost:11434'),
+            keep_alive=os.getenv('OLLAMA_KEEP_ALIVE', '-1')
         )
 
     def process_pdf(self, pdf_path):
@@ -45,46 +80,104 @@ class PDFIngestionService:
         print(f"{'='*60}\n")
 
         try:
-            # Step 1: Extract text with OCR
-            print("Step 1: Extracting text from PDF...")
-            ocr_text = self.ocr_processor.extract_text_from_pdf(pdf_path)
-            print(f"✓ Extracted {len(ocr_text)} characters")
-
-            # Step 2: AI Analysis
-            print("\nStep 2: Analyzing with AI...")
-            analysis = self.ai_analyzer.analyze_consent_form(ocr_text)
-            print(f"✓ Analysis complete")
-            print(f"  Patient: {analysis['patient_name']}")
-            print(f"  Email: {analysis['patient_email']}")
-            print(f"  Procedure: {analysis['procedure']}")
-
-            # Step 3: Store in database
-            print("\nStep 3: Storing in database...")
-            result = self._store_consent_data(pdf_path, ocr_text, analysis)
-            print(f"✓ Stored successfully")
-
-            print(f"\n{'='*60}")
-            print("PROCESSING COMPLETE")
-            print(f"{'='*60}")
-            print(f"Patient Account:")
-            print(f"  Email: {analysis['patient_email']}")
-            print(f"  Password: {result['default_password']}")
-            print(f"{'='*60}\n")
-
-            return result
+            # Skip OCR and AI entirely for a byte-identical file that was already ingested
+            file_hash = self._hash_file(pdf_path)
+            existing = self._find_ingested(file_hash)
+            if existing:
+                print(f"✓ Already ingested as consent {existing['consent_id']} "
+                      f"for {existing['patient_email']}, skipping")
+                return existing
+
+            ocr_text, analysis = self.extract_and_analyze(pdf_path)
+            return self._store_and_report(pdf_path, ocr_text, analysis, file_hash)
 
         except Exception as e:
             print(f"\n✗ Error processing PDF: {str(e)}")
             raise
 
-    def _store_consent_data(self, pdf_path, ocr_text, analysis):
+    def extract_and_analyze(self, pdf_path):
+        """
+        Run OCR and AI analysis on a PDF without touching the database
+
+        Args:
+            pdf_path: Path to PDF file
+
+        Returns:
+            tuple: (ocr_text, analysis)
+        """
+        # Step 1: Extract text with OCR
+        print(f"Step 1: Extracting text from {os.path.basename(pdf_path)}...")
+        ocr_text = self.ocr_processor.extract_text_from_pdf(pdf_path)
+        print(f"✓ Extracted {len(ocr_text)} characters")
+
+        # Step 2: AI Analysis
+        print("\nStep 2: Analyzing with AI...")
+        analysis = self.ai_analyzer.analyze_consent_form(ocr_text)
+        print(f"✓ Analysis complete")
+        print(f"  Patient: {analysis['patient_name']}")
+        print(f"  Email: {analysis['patient_email']}")
+        print(f"  Procedure: {analysis['procedure']}")
+
+        return ocr_text, analysis
+
+    def _store_and_report(self, pdf_path, ocr_text, analysis, file_hash):
+        """Store an analyzed PDF and print the patient's login details"""
+        # Step 3: Store in database
+        print("\nStep 3: Storing in database...")
+        result = self._store_consent_data(pdf_path, ocr_text, analysis, file_hash)
+        print(f"✓ Stored successfully")
+
+        print(f"\n{'='*60}")
+        print("PROCESSING COMPLETE")
+        print(f"{'='*60}")
+        print(f"Patient Account:")
+        print(f"  Email: {analysis['patient_email']}")
+        print(f"  Password: {result['default_password']}")
+        print(f"{'='*60}\n")
+
+        return result
+
+    def _hash_file(self, pdf_path):
+        """Content hash used to detect already-ingested files"""
+        with open(pdf_path, 'rb') as f:
+            return compute_file_hash(f)
+
+    def _find_ingested(self, file_hash):
+        """Return the stored result for a previously ingested file, or None"""
+        db_session = self.db_session
+
+        try:
+            row = db_session.query(Consent, Patient).join(Patient).filter(
+                Consent.file_hash == file_hash
+            ).first()
+            if not row:
+                return None
+
+            consent, patient = row
+            return {
+                'success': True,
+                'patient_id': patient.id,
+                'patient_name': patient.patient_name,
+                'patient_email': patient.email,
+                'default_password': patient.default_password,
+                'consent_id': consent.id,
+                'filename': consent.filename
+            }
+        finally:
+            db_session.rollback()  # End the read transaction so the next lookup sees fresh data
+
+    def _store_consent_data(self, pdf_path, ocr_text, analysis, file_hash):
         """Store consent data in database"""
-        db_session = self.db_manager.get_session()
+        db_session = self.db_session
+        consent = None
 
         try:
+            now = datetime.utcnow()  # Same timestamp on the consent and its entity index
             filename = os.path.basename(pdf_path)
-            patient_email = analysis['patient_email'].lower()
-            patient_name = analysis['patient_name']
+            (patient_name, raw_email, patient_dob, doctor_name, procedure,
+             procedure_date, consented_items, declined_items, summary) = _ENTITY_FIELDS(
+                defaultdict(lambda: None, analysis))
+            patient_email = raw_email.lower()
 
             # Step 1: Create or get patient account
             patient = db_session.query(Patient).filter(Patient.email == patient_email).first()
@@ -115,35 +208,34 @@ class PDFIngestionService:
             consent = Consent(
                 patient_id=patient.id,
                 filename=filename,
-                full_text=ocr_text,
+                full_text_path=self.db_manager.save_full_text(file_hash, ocr_text),
                 ai_analysis_json=json.dumps(analysis),
-                processed_timestamp=datetime.utcnow()
+                file_hash=file_hash,
+                processed_timestamp=now
             )
-            db_session.add(consent)
-            db_session.flush()  # Get consent.id
             print(f"  ✓ Consent record created")
 
             # Step 3: Create entity index for searchability
             print(f"  Creating entity index...")
             entity_index = EntityIndex(
-                consent_id=consent.id,
+                consent=consent,  # consent_id is assigned when both rows are flushed
                 patient_id=patient.id,
-                patient_name=analysis['patient_name'],
-                patient_email=analysis['patient_email'],
-                patient_dob=analysis.get('patient_dob'),
-                doctor_name=analysis.get('doctor_name'),
-                procedure=analysis.get('procedure'),
-                procedure_date=analysis.get('procedure_date'),
-                consented_items=json.dumps(analysis.get('consented_items', [])),
-                declined_items=json.dumps(analysis.get('declined_items', [])),
-                summary=analysis.get('summary'),
+                patient_name=patient_name,
+                patient_email=raw_email,
+                patient_dob=patient_dob,
+                doctor_name=doctor_name,
+                procedure=procedure,
+                procedure_date=procedure_date,
+                consented_items=consented_items or [],
+                declined_items=declined_items or [],
+                summary=summary,
                 search_terms=self._generate_search_terms(analysis),
-                processed_timestamp=datetime.utcnow()
+                processed_timestamp=now
             )
-            db_session.add(entity_index)
             print(f"  ✓ Entity index created")
 
-            # Commit all changes
+            # Insert consent and entity index together in a single commit
+            db_session.add_all([consent, entity_index])
             db_session.commit()
 
             return {
@@ -158,33 +250,18 @@ class PDFIngestionService:
 
         except Exception as e:
             db_session.rollback()
+            # Don't leave the OCR text file behind for a consent that was never stored
+            if consent is not None:
+                self.db_manager.discard_full_text(consent.full_text_path)
             raise e
         finally:
-            db_session.close()
+            db_session.expire_all()  # Keep the session, but re-read rows on next use
 
     def _generate_search_terms(self, analysis):
         """Generate search terms for entity index"""
-        terms = []
-
-        # Add patient name variations
-        if analysis.get('patient_name'):
-            terms.append(analysis['patient_name'].lower())
-            name_parts = analysis['patient_name'].lower().split()
-            terms.extend(name_parts)
-
-        # Add email
-        if analysis.get('patient_email'):
-            terms.append(analysis['patient_email'].lower())
-
-        # Add procedure
-        if analysis.get('procedure'):
-            terms.append(analysis['procedure'].lower())
-
-        # Add doctor
-        if analysis.get('doctor_name'):
-            terms.append(analysis['doctor_name'].lower())
-
-        return ' '.join(set(terms))
+        # Patient name, email, procedure and doctor, lowercased and de-duplicated word by word
+        fields = _SEARCH_FIELDS(defaultdict(lambda: None, analysis))
+        return ' '.join({word for value in fields if value for word in value.lower().split()})
 
     def process_directory(self, directory_path):
         """Process all PDFs in a directory"""
@@ -192,7 +269,10 @@ class PDFIngestionService:
             print(f"Error: {directory_path} is not a directory")
             return
 
-        pdf_files = [f for f in os.listdir(directory_path) if f.endswith('.pdf')]
+        pdf_files = sorted(
+            entry.path for entry in os.scandir(directory_path)
+            if entry.is_file() and entry.name.lower().endswith('.pdf')
+        )
 
         if not pdf_files:
             print(f"No PDF files found in {directory_path}")
@@ -200,15 +280,42 @@ class PDFIngestionService:
 
         print(f"\nFound {len(pdf_files)} PDF files to process\n")
 
+        # Skip files (or byte-identical copies) that are already in the database
         results = []
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(directory_path, pdf_file)
-            try:
-                result = self.process_pdf(pdf_path)
-                results.append(result)
-            except Exception as e:
-                print(f"Failed to process {pdf_file}: {str(e)}")
-                continue
+        to_process = {}
+        for pdf_path in pdf_files:
+            file_hash = self._hash_file(pdf_path)
+            existing = self._find_ingested(file_hash)
+            if existing:
+                print(f"Skipping {os.path.basename(pdf_path)}: already ingested for {existing['patient_email']}")
+                results.append(existing)
+            elif file_hash in to_process:
+                print(f"Skipping {os.path.basename(pdf_path)}: identical to {os.path.basename(to_process[file_hash])}")
+            else:
+                to_process[file_hash] = pdf_path
+
+        # OCR + AI run in worker processes; this process is the single
+        # SQLite writer and stores each result as soon as it is ready
+        if to_process:
+            workers = min(len(to_process), int(os.getenv('INGEST_WORKERS', min(4, os.cpu_count() or 1))))
+            # Split the cores between files: each worker's OCR gets its share, so
+            # scanned PDFs never run more Tesseract processes than there are cores
+            ocr_workers = max(1, (os.cpu_count() or 1) // workers)
+            print(f"Processing {len(to_process)} PDFs with {workers} workers "
+                  f"({ocr_workers} OCR cores each)...\n")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_ingest_worker,
+                                     initargs=(ocr_workers,)) as executor:
+                futures = {
+                    executor.submit(_extract_and_analyze, pdf_path): (pdf_path, file_hash)
+                    for file_hash, pdf_path in to_process.items()
+                }
+                for future in as_completed(futures):
+                    pdf_path, file_hash = futures[future]
+                    try:
+                        ocr_text, analysis = future.result()
+                        results.append(self._store_and_report(pdf_path, ocr_text, analysis, file_hash))
+                    except Exception as e:
+                        print(f"Failed to process {os.path.basename(pdf_path)}: {str(e)}")
 
         # Summary
         print(f"\n{'='*60}")
@@ -221,6 +328,21 @@ class PDFIngestionService:
         print(f"{'='*60}\n")
 
 
+# Per-process service used by process_directory's worker pool
+_worker_service = None
+
+
+def _init_ingest_worker(ocr_workers):
+    """Build one ingestion service per worker process with its share of the OCR cores"""
+    global _worker_service
+    _worker_service = PDFIngestionService(ocr_workers=ocr_workers)
+
+
+def _extract_and_analyze(pdf_path):
+    """OCR and analyze a PDF in a worker process"""
+    return _worker_service.extract_and_analyze(pdf_path)
+
+
 def main():
     """Main function"""
     if len(sys.argv) < 2:
@@ -231,20 +353,17 @@ def main():
 
     path = sys.argv[1]
 
-    # Check Ollama
+    # Check Ollama with the same analyzer (and HTTP client) the service will use
+    service = PDFIngestionService()
     print("Checking Ollama connection...")
-    analyzer = AIAnalyzer()
-    if not analyzer.check_ollama_connection():
+    if not service.ai_analyzer.check_ollama_connection():
         print("\nERROR: Ollama is not running or model not found!")
         print("Please:")
         print("1. Install Ollama: https://ollama.ai/download")
         print("2. Start Ollama: ollama serve")
-        print("3. Pull model: ollama pull llama3.1")
+        print("3. Pull models: ollama pull llama3.1:8b-instruct-q4_K_M && ollama pull llama3.2:3b-instruct-q4_K_M")
         sys.exit(1)
 
-    # Initialize service
-    service = PDFIngestionService()
-
     # Process path
     if os.path.isfile(path):
         service.process_pdf(path)
@@ -7,13 +7,16 @@ import json
 
 API_URL = "http://localhost:5000/api"
 
+# One keep-alive connection pool shared by every test request
+SESSION = requests.Session()
+
 def test_health():
     """Test health endpoint"""
     print("\n" + "="*50)
     print("Testing Health Endpoint")
     print("="*50)
 
-    response = requests.get(f"{API_URL}/health")
+    response = SESSION.get(f"{API_URL}/health")
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)}")
 
@@ -31,10 +34,9 @@ def test_login(email, password):
         "password": password
     }
 
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/login",
-        json=payload,
-        headers={"Content-Type": "application/json"}
+        json=payload
     )
 
     print(f"Status: {response.status_code}")
@@ -51,7 +53,7 @@ def test_stats(session_token):
     print("Testing Stats Endpoint")
     print("="*50)
 
-    response = requests.get(
+    response = SESSION.get(
         f"{API_URL}/stats",
         headers={"Authorization": f"Bearer {session_token}"}
     )
@@ -72,19 +74,38 @@ def test_query(session_token, query_text):
         "query": query_text
     }
 
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/query",
         json=payload,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {session_token}"
-        }
+        headers={"Authorization": f"Bearer {session_token}"},
+        stream=True
     )
 
     print(f"Status: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
 
-    return response.ok
+    if not response.ok:
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+        return False
+
+    # Answer is streamed as Server-Sent Events: data: {"token": ...} ... data: [DONE],
+    # with a data: {"error": ...} event before [DONE] if generation failed
+    print("Answer: ", end="", flush=True)
+    for line in response.iter_lines(decode_unicode=True):
+        if not line.startswith("data: "):
+            continue
+        payload = line[len("data: "):]
+        if payload == "[DONE]":
+            break
+        event = json.loads(payload)
+        if "error" in event:
+            print(f"\nError: {event['error']}")
+            response.close()
+            return False
+        print(event["token"], end="", flush=True)
+    print()
+    response.close()
+
+    return True
 
 
 def test_logout(session_token):
@@ -93,7 +114,7 @@ def test_logout(session_token):
     print("Testing Logout Endpoint")
     print("="*50)
 
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/logout",
         headers={"Authorization": f"Bearer {session_token}"}
     )
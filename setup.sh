@@ -24,7 +24,7 @@ echo "Checking Ollama installation..."
 if ! command -v ollama &> /dev/null; then
     echo "❌ Ollama not found"
     echo "Please install from: https://ollama.ai/download"
-    echo "Then run: ollama pull llama3.1"
+    echo "Then run: ollama pull llama3.1:8b-instruct-q4_K_M && ollama pull llama3.2:3b-instruct-q4_K_M && ollama pull nomic-embed-text"
     exit 1
 fi
 echo "✓ Ollama found"
@@ -32,12 +32,24 @@ echo "✓ Ollama found"
 # Check if model is available
 echo ""
 echo "Checking Ollama model..."
-if ! ollama list | grep -q "llama3.1"; then
-    echo "⚠️  llama3.1 model not found"
-    echo "Downloading llama3.1 model (this may take a few minutes)..."
-    ollama pull llama3.1
+if ! ollama list | grep -q "llama3.1:8b-instruct-q4_K_M"; then
+    echo "⚠️  llama3.1:8b-instruct-q4_K_M model not found"
+    echo "Downloading llama3.1:8b-instruct-q4_K_M model (this may take a few minutes)..."
+    ollama pull llama3.1:8b-instruct-q4_K_M
 fi
-echo "✓ llama3.1 model available"
+echo "✓ llama3.1:8b-instruct-q4_K_M model available"
+if ! ollama list | grep -q "llama3.2:3b-instruct-q4_K_M"; then
+    echo "⚠️  llama3.2:3b-instruct-q4_K_M model not found"
+    echo "Downloading llama3.2:3b-instruct-q4_K_M model (this may take a few minutes)..."
+    ollama pull llama3.2:3b-instruct-q4_K_M
+fi
+echo "✓ llama3.2:3b-instruct-q4_K_M model available"
+if ! ollama list | grep -q "nomic-embed-text"; then
+    echo "⚠️  nomic-embed-text model not found (used by the query answer cache)"
+    echo "Downloading nomic-embed-text model..."
+    ollama pull nomic-embed-text
+fi
+echo "✓ nomic-embed-text model available"
 
 # Create virtual environment
 echo ""